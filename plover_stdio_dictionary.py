@@ -1,18 +1,35 @@
 # vim: set fileencoding=utf-8 :
-from typing import Generic, IO, Literal, ParamSpec, TypeVar
+from typing import IO, Literal, ParamSpec, TypeVar
 from typing import cast, overload, TYPE_CHECKING
 from collections.abc import Callable
+from collections import OrderedDict
 import subprocess
 import json
+import base64
+import hashlib
+import struct
 import threading
 import queue
-import inspect
+import os
+import select
+import socket
+import sys
+import time
 from enum import Enum
-from dataclasses import dataclass
 
 from plover import log  # type: ignore
 from plover.steno_dictionary import StenoDictionary  # type: ignore
 
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 
 T = TypeVar('T')
 
@@ -23,142 +40,115 @@ R = TypeVar('R')
 # type hack for sentinel values from
 # https://stackoverflow.com/questions/57959664/handling-conditional-logic-sentinel-value-with-mypy
 class Sentinels(Enum):
-    GIVEN_DEFAULT = 0  # used for `ReturnArg`
-    NO_DEFAULT = 1  # used in `StdioDictionary._extract`
+    NO_DEFAULT = 0  # used in `StdioDictionary._extract`
 
 
-GivenDefault = Literal[Sentinels.GIVEN_DEFAULT]
-GIVEN_DEFAULT: GivenDefault = Sentinels.GIVEN_DEFAULT
-
 NoDefault = Literal[Sentinels.NO_DEFAULT]
 NO_DEFAULT: NoDefault = Sentinels.NO_DEFAULT
 
 
-class NoDefaultNeeded(Generic[T]):
-    pass
+# length prefix of a message in the framed (msgpack) protocol
+FRAME_HEADER = struct.Struct("<I")
 
+# a message received from the dictionary, without framing
+Message = bytes | bytearray
 
-def is_exception_type(obj: object) -> bool:
-    return isinstance(obj, type) and issubclass(obj, Exception)
+# maximum number of bytes read from the dictionary at once
+READ_SIZE = 65536
 
+# `select` only works on pipes outside of Windows, there a thread
+# blocks on reading instead
+USE_SELECT = sys.platform != "win32"
 
-@dataclass
-class ReturnArg(Generic[T]):
-    name: str
-    or_default: object | GivenDefault = GIVEN_DEFAULT
+# dictionaries can switch to a UNIX socket passed as an inherited
+# file descriptor, which is not possible on Windows
+USE_SOCKET = sys.platform != "win32"
 
+# name of the environment variable with the socket's descriptor
+SOCKET_FD_VARIABLE = "PLOVER_DICTIONARY_FD"
 
-@overload
-def handle_error(
-    return_ty: type[R], method: Literal["error"],
-    default: NoDefaultNeeded[R] = NoDefaultNeeded(),
-    *, ignore_inactive: bool = False
-) -> Callable[[Callable[P, R]], Callable[P, R]]:  ...
+# number of translations (including missing ones) kept in memory
+CACHE_SIZE = 4096
 
+# number of slots of the direct-mapped cache in front of it, has to
+# be a power of two
+FAST_CACHE_SIZE = 256
 
-@overload
-def handle_error(
-    return_ty: type[R], method: Literal["log"],
-    default: ReturnArg[R] | Callable[[], R] | R | type[Exception],
-    *, ignore_inactive: bool = False
-) -> Callable[[Callable[P, R]], Callable[P, R]]:  ...
 
+# Requests are always encoded by `json` so they stay ASCII-only
+# (`orjson` would send raw UTF-8 and rejects lone surrogates), but
+# `orjson` is used for decoding if it is installed, since it is a
+# lot faster at handling the many tiny messages
+def json_dumps(obj: object) -> bytes:
+    return json.dumps(obj).encode("ascii")
 
-def handle_error(
-    return_ty: type[R], method: Literal["error", "log"],
-    default: ReturnArg[R] | Callable[[], R] | R | type[Exception]
-    | NoDefaultNeeded[R] = NoDefaultNeeded(),
-    *, ignore_inactive: bool = False
-) -> Callable[[Callable[P, R]], Callable[P, R]]:
-    """
-    Error handling when the question of when and how to throw
-    errors is complicated is going to be a mess either way.
-
-    This decorator is supposed to simplify it a bit on the other
-    methods to aid in their readability, though in doing so all
-    the ugly details are swept under a very inelegant rug - this
-    function.
-
-    `method` is either:
-    * "error" - the error is passed on as is
-    * "log"   - the error is logged
-
-    `default` is either
-    * `ReturnArg(...)`  - return a given argument. Note that
-                          this uses `inspect` to try and get the
-                          correct position and default if
-                          `GIVEN_DEFAULT` is used (used for
-                          `StenoDictionary.get`)
-    * a callable object - return the result of a call with empty
-                          arguments (used for mutable defaults,
-                          so `lambda: []` instead of `[]`)
-    * an exception type - raise that exception. This also causes
-                          exceptions of that type to not be
-                          logged and be rethrown without
-                          modification (used for
-                          `StenoDictionary.__getitem__`)
-    * any other object  - returned as is
-
-    If `ignore_inactive` is `True` this function will not
-    immediately try and return the default and instead run the
-    function anyway (used for `StenoDictionary._load`).
-    """
-    def accept_function(func: Callable[P, R]) -> Callable[P, R]:
-        if isinstance(default, ReturnArg):
-            parameters = inspect.signature(func).parameters
-            arg_default = (
-                cast(R, parameters[default.name].default)
-                if default.or_default is GIVEN_DEFAULT
-                else cast(R, default.or_default)
-            )
-            arg_pos = next(
-                idx
-                for idx, name in enumerate(parameters.keys())
-                if name == default.name
-            )
 
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            self: StdioDictionary = \
-                cast(StdioDictionary, args[0])
-
-            def return_value() -> R:
-                if isinstance(default, ReturnArg):
-                    if default.name in kwargs:
-                        return cast(R, kwargs["fallback"])
-                    elif arg_pos < len(args):
-                        return cast(R, args[arg_pos])
-                    else:
-                        return arg_default
-                elif is_exception_type(default):
-                    raise cast(type[Exception], default)
-                elif hasattr(default, "__call__"):
-                    return cast(Callable[[], R], default)()
-                else:
-                    return cast(R, default)
-
-            if not self._active and not ignore_inactive:
-                return return_value()
+json_loads: Callable[[Message], object] = (
+    orjson.loads if orjson is not None else json.loads
+)
 
-            try:
-                return func(*args, **kwargs)
-            except Exception as ex:
-                if is_exception_type(default):
-                    if isinstance(ex, cast(type, default)):
-                        raise ex  # rethrow unchanged
 
-                self._active = False
+def encode_json(request: dict[str, object]) -> bytes:
+    return json_dumps(request) + b"\n"
 
-                if method == "log":
-                    log.error(str(ex))
-                    return return_value()
-                elif method == "error":
-                    raise ex
-                else:
-                    raise NotImplementedError from ex
 
-        return wrapper
+# The requests sent for every (uncached) stroke are formatted
+# directly instead of going through a dictionary
 
-    return accept_function
+def encode_json_translate(key: tuple[str, ...], seq: int) -> bytes:
+    return b'{"translate": %b, "seq": %d}\n' % (json_dumps(key), seq)
+
+
+def encode_json_untranslate(value: str, seq: int) -> bytes:
+    return b'{"untranslate": %b, "seq": %d}\n' % (json_dumps(value), seq)
+
+
+def encode_msgpack(request: dict[str, object]) -> bytes:
+    payload = msgpack.packb(request)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+# a map with two entries, then the first key
+MSGPACK_TRANSLATE = b"\x82\xa9translate"
+MSGPACK_UNTRANSLATE = b"\x82\xabuntranslate"
+# the second key
+MSGPACK_SEQ = b"\xa3seq"
+
+
+def encode_msgpack_translate(key: tuple[str, ...], seq: int) -> bytes:
+    payload = (
+        MSGPACK_TRANSLATE + msgpack.packb(key)
+        + MSGPACK_SEQ + msgpack.packb(seq)
+    )
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def encode_msgpack_untranslate(value: str, seq: int) -> bytes:
+    payload = (
+        MSGPACK_UNTRANSLATE + msgpack.packb(value)
+        + MSGPACK_SEQ + msgpack.packb(seq)
+    )
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_msgpack(payload: Message) -> object:
+    return msgpack.unpackb(payload, raw=False)
+
+
+def handle_error(func: Callable[P, R]) -> Callable[P, R]:
+    """
+    Deactivates the dictionary if `func` raises, passing the error
+    on as is (used for `StenoDictionary._load`, the lookup methods
+    log their errors by hand instead).
+    """
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            cast(StdioDictionary, args[0])._active = False
+            raise
+
+    return wrapper
 
 
 class StdioDictionary(StenoDictionary):  # type: ignore
@@ -168,47 +158,172 @@ class StdioDictionary(StenoDictionary):  # type: ignore
         super().__init__()
 
         self._filename: str
-        self._process: subprocess.Popen[str] | None = None
-        self._stdout: queue.SimpleQueue[str | None]
+        self._process: subprocess.Popen[bytes] | None = None
+        self._socket: socket.socket | None = None
+        self._read_fd: int
+        self._stdin_fd: int
+        self._send: Callable[[bytes], None]
+        self._chunks: queue.SimpleQueue[bytes]  # without `select`
+        self._buffer = bytearray()
+        self._framed: bool
+        self._encode: Callable[[dict[str, object]], bytes]
+        self._encode_translate: Callable[[tuple[str, ...], int], bytes]
+        self._encode_untranslate: Callable[[str, int], bytes]
+        self._decode: Callable[[Message], object]
 
         self._longest_key: int
         self._timeout: float | None = None
         self._untranslate: bool
+        self._batch: bool
+        self._pipeline: bool
+        self._caching: bool
+
+        # bloom filter of all keys, if the dictionary sent one
+        self._bloom: bytes | None = None
+        self._bloom_size: int
+        self._bloom_hashes: int
+
+        # least recently used translations, `None` for missing ones
+        self._cache: OrderedDict[tuple[str, ...], str | None] = \
+            OrderedDict()
+        # the last translation for each slot of `hash(key)`, without
+        # any bookkeeping on hits
+        self._fast_cache: list[tuple[tuple[str, ...], str | None] | None] \
+            = [None] * FAST_CACHE_SIZE
+        # without caching, the other suffixes of the last batched or
+        # pipelined lookup, until they are looked up themselves
+        self._batched: dict[tuple[str, ...], str | None] = {}
 
         self._seq: int
+        # responses that came before the one being waited for
+        self._responses: dict[int, object] = {}
 
         self._active: bool = False
 
         self.readonly = True
 
-    def _expect_stdout(self) -> object:
-        out_s = self._stdout.get(timeout=self._timeout)
+    def _read_chunk(self, deadline: float | None) -> bytes:
+        timeout = (
+            max(deadline - time.monotonic(), 0.)
+            if deadline is not None
+            else None
+        )
+
+        if not USE_SELECT:
+            try:
+                return self._chunks.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"Dictionary {self._filename} did not respond "
+                    f"in time"
+                ) from None
+
+        while True:
+            ready, _, _ = select.select(
+                [self._read_fd], [], [], timeout
+            )
+            if not ready:
+                raise TimeoutError(
+                    f"Dictionary {self._filename} did not respond "
+                    f"in time"
+                )
+            try:
+                return os.read(self._read_fd, READ_SIZE)
+            except BlockingIOError:
+                pass
+
+    def _single_message(self, chunk: bytes) -> Message | None:
+        # Usually a chunk is exactly one message, which then skips
+        # the copies into and back out of the buffer (framed messages
+        # are still copied once to cut off the length prefix, so
+        # decoders always get bytes)
+        if self._framed:
+            if (
+                len(chunk) >= FRAME_HEADER.size
+                and FRAME_HEADER.size + FRAME_HEADER.unpack_from(chunk)[0]
+                == len(chunk)
+            ):
+                return chunk[FRAME_HEADER.size:]
+        elif chunk.find(b"\n") == len(chunk) - 1:
+            return chunk
+
+        return None
+
+    def _split_message(self) -> Message | None:
+        buffer = self._buffer
+        if self._framed:
+            if len(buffer) < FRAME_HEADER.size:
+                return None
+            (length,) = FRAME_HEADER.unpack_from(buffer)
+            start = FRAME_HEADER.size
+            end = start + length
+            if len(buffer) < end:
+                return None
+        else:
+            start = 0
+            end = buffer.find(b"\n") + 1
+            if end == 0:
+                return None
+
+        message = buffer[start:end]
+        del buffer[:end]
+        return message
+
+    def _deadline(self) -> float | None:
+        # Computed once per awaited exchange, so a dictionary can't
+        # stretch the latency by trickling in several messages
+        return (
+            time.monotonic() + self._timeout
+            if self._timeout is not None
+            else None
+        )
+
+    def _read_message(self, deadline: float | None) -> Message | None:
+        while True:
+            message = self._split_message()
+            if message is not None:
+                return message
+
+            chunk = self._read_chunk(deadline)
+            if not chunk:
+                return None
+            if not self._buffer:
+                message = self._single_message(chunk)
+                if message is not None:
+                    return message
+            self._buffer += chunk
+
+    def _expect_stdout(self, deadline: float | None) -> object:
+        out_s = self._read_message(deadline)
         if out_s is None:
             raise ValueError(
                 f"Dictionary {self._filename} exited early"
             )
 
         try:
-            out = json.loads(out_s)
-        except json.decoder.JSONDecodeError as ex:
+            out = self._decode(out_s)
+        except ValueError as ex:
             raise ValueError(
-                f"Dictionary {self._filename} pushed invalid "
-                f"JSON: {out_s}"
+                f"Dictionary {self._filename} pushed an invalid "
+                f"message: {bytes(out_s)!r}"
             ) from ex
 
         return out
 
+    def _missing(self, name: str) -> ValueError:
+        return ValueError(
+            f"Dictionary {self._filename} pushed an "
+            f"invalid object, expected {name} to be "
+            f"present"
+        )
+
     def _extract(
         self, obj: object, name: str, ty: type[T],
         *, default: T | NoDefault = NO_DEFAULT
     ) -> T:
         if not isinstance(obj, dict) or name not in obj:
             if default is NO_DEFAULT:
-                raise ValueError(
-                    f"Dictionary {self._filename} pushed an "
-                    f"invalid object, expected {name} to be "
-                    f"present"
-                )
+                raise self._missing(name)
             return default
 
         out = obj[name]
@@ -230,64 +345,210 @@ class StdioDictionary(StenoDictionary):  # type: ignore
 
         return out
 
+    # `_extract` specialized for the fields of every response
+
+    def _extract_int(
+        self, obj: object, name: str,
+        *, default: int | NoDefault = NO_DEFAULT
+    ) -> int:
+        out = obj.get(name, default) if isinstance(obj, dict) else default
+        if out is NO_DEFAULT:
+            raise self._missing(name)
+        if not isinstance(out, int):
+            raise ValueError(f"Expected {name} to be of type {int!r}")
+        return out
+
+    def _extract_str_or_none(self, obj: object, name: str) -> str | None:
+        out = obj.get(name) if isinstance(obj, dict) else None
+        if out is not None and not isinstance(out, str):
+            raise ValueError(
+                f"Expected {name} to be of type {str | None!r}"
+            )
+        return out
+
+    def _extract_list(
+        self, obj: object, name: str,
+        *, default: list[object] | NoDefault = NO_DEFAULT
+    ) -> list[object]:
+        out = obj.get(name, default) if isinstance(obj, dict) else default
+        if out is NO_DEFAULT:
+            raise self._missing(name)
+        if not isinstance(out, list):
+            raise ValueError(f"Expected {name} to be of type {list!r}")
+        return out
+
     def _setup_process(self) -> None:
         # terminate earlier instances if they exist:
         if self._process is not None:
             self._process.terminate()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+        env = None
+        pass_fds: tuple[int, ...] = ()
+        if USE_SOCKET:
+            self._socket, child_socket = socket.socketpair()
+            env = dict(os.environ)
+            env[SOCKET_FD_VARIABLE] = str(child_socket.fileno())
+            pass_fds = (child_socket.fileno(),)
 
-        self._process = subprocess.Popen(
-            [self._filename],
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        try:
+            self._process = subprocess.Popen(
+                [self._filename],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env, pass_fds=pass_fds
+            )
+        finally:
+            if USE_SOCKET:
+                child_socket.close()
 
-        def handle_errors(file: IO[str]) -> None:
+        def handle_errors(file: IO[bytes]) -> None:
             for i in file:
-                log.error(i)
+                log.error(i.decode(errors="replace"))
 
         threading.Thread(
             target=handle_errors, args=(self._process.stderr,),
             daemon=True
         ).start()
 
+        # The configuration is always sent as a JSON line on stdout
+        self._buffer = bytearray()
+        self._framed = False
+        self._decode = json_loads
+        self._send = self._write_stdin
+
+        assert self._process.stdin is not None
+        assert self._process.stdout is not None
+        self._stdin_fd = self._process.stdin.fileno()
+        self._read_fd = self._process.stdout.fileno()
+        if USE_SELECT:
+            os.set_blocking(self._read_fd, False)
+            return
+
         def handle_file(
-            file: IO[str],
-            output: queue.SimpleQueue[str | None]
+            fd: int, output: queue.SimpleQueue[bytes]
         ) -> None:
-            for i in file:
-                output.put(i)
-            output.put(None)
+            while chunk := os.read(fd, READ_SIZE):
+                output.put(chunk)
+            output.put(b"")
 
-        self._stdout = queue.SimpleQueue()
+        self._chunks = queue.SimpleQueue()
         threading.Thread(
-            target=handle_file,
-            args=(self._process.stdout, self._stdout),
+            target=handle_file, args=(self._read_fd, self._chunks),
             daemon=True
         ).start()
 
+    def _write_stdin(self, data: bytes) -> None:
+        # Every message is already a single `bytes` object, so it
+        # is written directly instead of buffered and flushed
+        written = os.write(self._stdin_fd, data)
+        if written == len(data):
+            return
+
+        view = memoryview(data)[written:]
+        while view:
+            view = view[os.write(self._stdin_fd, view):]
+
+    def _negotiate(self, config: object) -> None:
+        # Dictionaries advertising `socket` continue (in both
+        # directions) on the socket they got passed
+        if self._extract(config, "socket", bool, default=False):
+            if self._socket is None:
+                raise ValueError(
+                    f"Dictionary {self._filename} asked for a "
+                    f"socket, which is not supported here"
+                )
+            self._read_fd = self._socket.fileno()
+            self._send = self._socket.sendall
+
+        # Dictionaries advertising `msgpack` expect a single JSON
+        # line telling them if the rest of the session is framed
+        framed = False
+        if self._extract(config, "msgpack", bool, default=False):
+            framed = msgpack is not None
+            self._send(encode_json({"msgpack": framed}))
+
+        self._framed = framed
+        if framed:
+            self._encode = encode_msgpack
+            self._encode_translate = encode_msgpack_translate
+            self._encode_untranslate = encode_msgpack_untranslate
+            self._decode = decode_msgpack
+        else:
+            self._encode = encode_json
+            self._encode_translate = encode_json_translate
+            self._encode_untranslate = encode_json_untranslate
+            self._decode = json_loads
+
     def _communicate(
         self, request: dict[str, object]
     ) -> object:
         self._seq += 1
         request["seq"] = self._seq
 
-        assert self._process is not None
-        assert self._process.stdin is not None
-        self._process.stdin.write(json.dumps(request) + "\n")
-        self._process.stdin.flush()
-
-        seq = -1
-        while seq < self._seq:
-            response = self._expect_stdout()
-            seq = self._extract(response, "seq", int, default=-1)
-
-        if seq > self._seq:
-            raise ValueError("The dictionary is in the future")
+        self._send(self._encode(request))
+        return self._receive(self._seq, self._deadline())
+
+    def _receive(self, seq: int, deadline: float | None) -> object:
+        # With several requests in flight, responses can arrive in
+        # any order, so the ones for later requests are kept (only the
+        # first one, if it is duplicated). Those are always awaited in
+        # order, so anything for an earlier `seq` is stale and dropped
+        response = self._responses.pop(seq, NO_DEFAULT)
+        while response is NO_DEFAULT:
+            message = self._expect_stdout(deadline)
+            message_seq = self._extract_int(message, "seq", default=-1)
+            if message_seq == seq:
+                response = message
+            elif message_seq == -1:
+                self._handle_message(message)
+            elif message_seq > self._seq:
+                raise ValueError("The dictionary is in the future")
+            elif message_seq > seq:
+                self._responses.setdefault(message_seq, message)
 
         return response
 
-    @handle_error(type(None), "error", ignore_inactive=True)
+    def _handle_message(self, message: object) -> None:
+        # Messages without `seq` are sent on the dictionary's own
+        # initiative, currently only to invalidate translations
+        keys = self._extract_list(message, "invalidate", default=[])
+        for key in keys:
+            if not isinstance(key, list) or not all(
+                isinstance(i, str) for i in key
+            ):
+                raise ValueError(
+                    f"Expected invalidate to be of type "
+                    f"{list[list[str]]!r}"
+                )
+            key_t = tuple(key)
+            self._batched.pop(key_t, None)
+            self._cache.pop(key_t, None)
+            slot = hash(key_t) & (FAST_CACHE_SIZE - 1)
+            entry = self._fast_cache[slot]
+            if entry is not None and entry[0] == key_t:
+                self._fast_cache[slot] = None
+
+    def _remember(
+        self, key: tuple[str, ...], translation: str | None
+    ) -> None:
+        self._cache[key] = translation
+        self._cache.move_to_end(key)
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _remember_suffixes(
+        self, keys: list[tuple[str, ...]], outs: list[str | None]
+    ) -> None:
+        if self._caching:
+            for i, out in zip(keys, outs):
+                self._remember(i, out)
+        else:
+            self._batched = dict(zip(keys[1:], outs[1:]))
+
+    @handle_error
     def _load(self, filename: str) -> None:
         self._filename = filename
         self._active = True
@@ -296,7 +557,7 @@ class StdioDictionary(StenoDictionary):  # type: ignore
 
         # Get the global configuration for the dictionary
         self._timeout = None
-        config = self._expect_stdout()
+        config = self._expect_stdout(None)
 
         # Extract the longest key
         self._longest_key = \
@@ -322,7 +583,8 @@ class StdioDictionary(StenoDictionary):  # type: ignore
                     f"The maximum latency is not a valid "
                     f"value: {latency_ms}"
                 )
-        self._timeout = (
+        # (only applied after prefetching, which may take longer)
+        timeout = (
             latency_ms / 1000.
             if latency_ms is not None
             else None
@@ -333,38 +595,241 @@ class StdioDictionary(StenoDictionary):  # type: ignore
             config, "untranslate", bool, default=False
         )
 
+        # Extract if it is capable of batched translations
+        self._batch = self._extract(
+            config, "batch", bool, default=False
+        )
+
+        # Extract the bloom filter of all keys
+        bloom = self._extract(
+            config, "bloom",
+            cast(
+                type[dict[str, object] | None],
+                dict | type(None)
+            ),
+            default=None
+        )
+        self._bloom = None
+        if bloom is not None:
+            self._bloom_size = self._extract(bloom, "m", int)
+            self._bloom_hashes = self._extract(bloom, "k", int)
+            bits = base64.b64decode(
+                self._extract(bloom, "bits", str), validate=True
+            )
+            if self._bloom_size <= 0 or self._bloom_hashes <= 0:
+                raise ValueError(
+                    f"The bloom filter parameters are not valid: "
+                    f"m = {self._bloom_size}, "
+                    f"k = {self._bloom_hashes}"
+                )
+            if len(bits) != (self._bloom_size + 7) // 8:
+                raise ValueError(
+                    f"The bloom filter has {len(bits)} bytes "
+                    f"instead of {(self._bloom_size + 7) // 8}"
+                )
+            self._bloom = bits
+
+        # Extract if it accepts several requests in flight
+        self._pipeline = self._extract(
+            config, "pipeline", bool, default=False
+        )
+
+        # Extract if its translations may be cached
+        self._caching = self._extract(
+            config, "cache", bool, default=False
+        )
+
+        # Forget translations and responses of earlier instances
+        self._cache.clear()
+        self._fast_cache = [None] * FAST_CACHE_SIZE
+        self._batched.clear()
+        self._responses.clear()
+
+        # Pick the protocol for the rest of the session
+        self._negotiate(config)
+
         # Restart the sequence numbers
         self._seq = -1
 
+        # Fill the cache with the translations most likely to be
+        # used, if the dictionary can tell (and they are cached)
+        if self._caching and self._extract(
+            config, "prefetch", bool, default=False
+        ):
+            self._prefetch()
+
+        self._timeout = timeout
+
+    def _prefetch(self) -> None:
+        response = self._communicate({"prefetch": CACHE_SIZE})
+        entries = self._extract_list(response, "entries")
+
+        # The most likely entries come first, so they are
+        # remembered last (as the most recently used ones)
+        for entry in reversed(entries[:CACHE_SIZE]):
+            if not isinstance(entry, list) or len(entry) != 2:
+                raise ValueError(
+                    "Expected a prefetched entry to be a list of "
+                    "a stroke sequence and its translation"
+                )
+            key, translation = entry
+            if (
+                not isinstance(key, list)
+                or not all(isinstance(i, str) for i in key)
+                or not (translation is None or isinstance(translation, str))
+            ):
+                raise ValueError(
+                    f"Expected a prefetched entry to be of type "
+                    f"{list[str]!r}, {str | None!r}"
+                )
+            self._remember(tuple(key), translation)
+
     def _lookup(self, key: tuple[str, ...]) -> str:
         if len(key) > self._longest_key:
             raise KeyError
 
-        response = self._communicate({"translate": key})
-
-        out = self._extract(
-            response,
-            "translation",
-            cast(type[str | None], str | type(None)),
-            default=None
-        )
+        caching = self._caching
+        if caching:
+            slot = hash(key) & (FAST_CACHE_SIZE - 1)
+            entry = self._fast_cache[slot]
+            if entry is not None and entry[0] == key:
+                if entry[1] is None:
+                    raise KeyError
+                return entry[1]
+
+            out = self._cache.get(key, NO_DEFAULT)
+            if out is not NO_DEFAULT:
+                self._cache.move_to_end(key)
+        else:
+            out = self._batched.pop(key, NO_DEFAULT)
+
+        if out is not NO_DEFAULT:
+            pass
+        elif not self._may_contain(key):
+            out = None
+        elif self._batch and len(key) > 1:
+            out = self._lookup_batch(key)
+        elif self._pipeline and len(key) > 1:
+            out = self._lookup_pipelined(key)
+        else:
+            self._seq += 1
+            self._send(self._encode_translate(key, self._seq))
+            response = self._receive(self._seq, self._deadline())
+            out = self._extract_str_or_none(response, "translation")
+            if caching:
+                self._remember(key, out)
+
+        if caching:
+            self._fast_cache[slot] = (key, out)
 
         if out is None:
             raise KeyError
 
         return out
 
-    @handle_error(bool, "log", False)
+    def _may_contain(self, key: tuple[str, ...]) -> bool:
+        # Definite misses are answered without a round trip, they
+        # are not cached since checking the filter is cheap enough
+        if self._bloom is None:
+            return True
+
+        digest = hashlib.blake2b(
+            "/".join(key).encode(), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little")
+
+        for i in range(self._bloom_hashes):
+            bit = (h1 + i * h2) % self._bloom_size
+            if not self._bloom[bit >> 3] >> (bit & 7) & 1:
+                return False
+
+        return True
+
+    def _suffixes(self, key: tuple[str, ...]) -> list[tuple[str, ...]]:
+        # Plover tries every suffix of the stroke buffer, longest
+        # first, so all of them are translated in one round trip
+        return [
+            key[i:]
+            for i in range(len(key))
+            if i == 0 or (
+                key[i:] not in self._cache
+                and self._may_contain(key[i:])
+            )
+        ]
+
+    def _lookup_batch(self, key: tuple[str, ...]) -> str | None:
+        keys = self._suffixes(key)
+        response = self._communicate({"translate-batch": keys})
+        outl = self._extract_list(response, "translations")
+        if len(outl) != len(keys):
+            raise ValueError(
+                f"Dictionary {self._filename} pushed "
+                f"{len(outl)} translations for {len(keys)} keys"
+            )
+        if not all(i is None or isinstance(i, str) for i in outl):
+            raise ValueError(
+                f"Expected translations to be of type "
+                f"{list[str | None]!r}"
+            )
+        outs = cast(list[str | None], outl)
+
+        self._remember_suffixes(keys, outs)
+        return outs[0]
+
+    def _lookup_pipelined(self, key: tuple[str, ...]) -> str | None:
+        # Without batches, all requests are still sent at once and
+        # only then are the responses awaited
+        keys = self._suffixes(key)
+        first_seq = self._seq + 1
+        self._seq += len(keys)
+        self._send(b"".join(
+            self._encode_translate(i, seq)
+            for seq, i in enumerate(keys, first_seq)
+        ))
+
+        deadline = self._deadline()
+        outs = [
+            self._extract_str_or_none(
+                self._receive(seq, deadline), "translation"
+            )
+            for seq in range(first_seq, first_seq + len(keys))
+        ]
+
+        self._remember_suffixes(keys, outs)
+        return outs[0]
+
+    # The lookup methods are called on every stroke, so they do
+    # the same as `handle_error(..., "log", ...)` by hand
+
+    def _fail(self, ex: Exception) -> None:
+        self._active = False
+        log.error(str(ex))
+
     def __contains__(self, key: tuple[str, ...]) -> bool:
+        if not self._active:
+            return False
+
         try:
             self._lookup(key)
             return True
         except KeyError:
             return False
+        except Exception as ex:
+            self._fail(ex)
+            return False
 
-    @handle_error(str, "log", KeyError)
     def __getitem__(self, key: tuple[str, ...]) -> str:
-        return self._lookup(key)
+        if not self._active:
+            raise KeyError
+
+        try:
+            return self._lookup(key)
+        except KeyError:
+            raise
+        except Exception as ex:
+            self._fail(ex)
+            raise KeyError
 
     @overload
     def get(self, key: tuple[str, ...]) -> str | None: ...
@@ -373,28 +838,43 @@ class StdioDictionary(StenoDictionary):  # type: ignore
     def get(self, key: tuple[str, ...], fallback: T) \
         -> str | T: ...
 
-    @handle_error(  # type: ignore
-        str | T | None, "log", ReturnArg("fallback")
-    )
     def get(
         self, key: tuple[str, ...], fallback: T | None = None
     ) -> str | T | None:
+        if not self._active:
+            return fallback
+
         try:
             return self._lookup(key)
         except KeyError:
             return fallback
+        except Exception as ex:
+            self._fail(ex)
+            return fallback
 
-    @handle_error(set[tuple[str, ...]], "log", lambda: set())
     def reverse_lookup(self, value: str) \
             -> set[tuple[str, ...]]:
-        response = self._communicate({"untranslate": value})
-        outl: list[object] = self._extract(
-            response,
-            "reverse-translation",
-            list[object] if TYPE_CHECKING else list,
-            default=[]
-        )
-        assert all(isinstance(i, list) for i in outl)
-        outll = cast(list[list[object]], outl)
-        assert all(isinstance(j, str) for i in outll for j in i)
-        return {tuple(i) for i in cast(list[list[str]], outll)}
+        if not self._active or not self._untranslate:
+            return set()
+
+        try:
+            self._seq += 1
+            self._send(self._encode_untranslate(value, self._seq))
+            response = self._receive(self._seq, self._deadline())
+            outl = self._extract_list(
+                response, "reverse-translation", default=[]
+            )
+            out: set[tuple[str, ...]] = set()
+            for i in outl:
+                if not isinstance(i, list) or not all(
+                    isinstance(j, str) for j in i
+                ):
+                    raise ValueError(
+                        f"Expected reverse-translation to be of type "
+                        f"{list[list[str]]!r}"
+                    )
+                out.add(tuple(i))
+            return out
+        except Exception as ex:
+            self._fail(ex)
+            return set()